@@ -8,6 +8,7 @@ __all__ = [
     'LimiterAdapter',
     'LimiterMixin',
     'LimiterSession',
+    'FastMemoryBucket',
     # pyrate-limiter main classes
     'Limiter',
     'BucketFullException',
@@ -1,13 +1,23 @@
+from bisect import bisect_right
 from fractions import Fraction
+from functools import lru_cache
 from inspect import signature
-from logging import getLogger
-from time import time
-from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Type, Union
+from itertools import count
+from logging import INFO, getLogger
+from threading import Lock
+from time import monotonic, time
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterable, Optional, Tuple, Type, Union
 from urllib.parse import urlparse
 from uuid import uuid4
 
 from pyrate_limiter import Duration, Limiter, RequestRate
-from pyrate_limiter.bucket import AbstractBucket, MemoryListBucket, MemoryQueueBucket
+from pyrate_limiter.bucket import (
+    AbstractBucket,
+    MemoryListBucket,
+    MemoryQueueBucket,
+    RedisBucket,
+)
+from pyrate_limiter.sqlite_bucket import SQLiteBucket
 from requests import PreparedRequest, Response, Session
 from requests.adapters import HTTPAdapter
 
@@ -17,6 +27,26 @@ else:
     MIXIN_BASE = object
 logger = getLogger(__name__)
 
+_default_bucket_ids = count()
+_shared_limiters: Dict[Tuple, Tuple[Limiter, str]] = {}
+_shared_limiters_lock = Lock()
+
+
+class FastMemoryBucket(MemoryListBucket):
+    """In-memory bucket that finds unexpired items with a binary search instead of a linear scan.
+    Items are always added in time order, so the bucket's list is already sorted.
+    """
+
+    def inspect_expired_items(self, time: float) -> Tuple[int, float]:
+        with self._lock:
+            idx = bisect_right(self._q, time)
+            if idx == len(self._q):
+                return 0, 0.0
+            return len(self._q) - idx, round(self._q[idx] - time, 3)
+
+
+MEMORY_BUCKETS = (MemoryListBucket, MemoryQueueBucket)
+
 
 class LimiterMixin(MIXIN_BASE):
     """Mixin class that adds rate-limiting behavior to requests.
@@ -32,7 +62,7 @@ class LimiterMixin(MIXIN_BASE):
         per_day: float = 0,
         per_month: float = 0,
         burst: float = 1,
-        bucket_class: Type[AbstractBucket] = MemoryListBucket,
+        bucket_class: Type[AbstractBucket] = FastMemoryBucket,
         bucket_kwargs: Optional[Dict] = None,
         time_function: Optional[Callable[..., float]] = None,
         limiter: Optional[Limiter] = None,
@@ -40,20 +70,22 @@ class LimiterMixin(MIXIN_BASE):
         per_host: bool = True,
         limit_statuses: Iterable[int] = (429,),
         bucket_name: Optional[str] = None,
+        share_limiter: bool = False,
         **kwargs,
     ):
-        # Translate request rate values into RequestRate objects
-        rates = [
-            _convert_rate(limit, interval)
-            for interval, limit in {
-                Duration.SECOND * burst: per_second * burst,
-                Duration.MINUTE: per_minute,
-                Duration.HOUR: per_hour,
-                Duration.DAY: per_day,
-                Duration.MONTH: per_month,
-            }.items()
-            if limit
-        ]
+        # Translate request rate values into RequestRate objects. If a burst makes the per-second
+        # interval the same as another interval, the smaller limit applies.
+        limits: Dict[float, float] = {}
+        for interval, limit in (
+            (Duration.SECOND * burst, per_second * burst),
+            (Duration.MINUTE, per_minute),
+            (Duration.HOUR, per_hour),
+            (Duration.DAY, per_day),
+            (Duration.MONTH, per_month),
+        ):
+            if limit:
+                limits[interval] = min(limit, limits.get(interval, limit))
+        rates = [_convert_rate(limit, interval) for interval, limit in limits.items()]
         if rates and not limiter:
             logger.debug(
                 "Creating Limiter with rates:\n%s",
@@ -61,20 +93,30 @@ class LimiterMixin(MIXIN_BASE):
             )
 
         # If using a persistent backend, we don't want to use monotonic time (the default)
-        if bucket_class not in (MemoryListBucket, MemoryQueueBucket) and not time_function:
+        if not issubclass(bucket_class, MEMORY_BUCKETS) and not time_function:
             time_function = time
 
-        self.limiter = limiter or Limiter(
-            *rates,
-            bucket_class=bucket_class,
-            bucket_kwargs=bucket_kwargs,
-            time_function=time_function,
-        )
-        self.limit_statuses = limit_statuses
+        default_bucket = None
+        if not limiter and share_limiter:
+            limiter, default_bucket = _get_shared_limiter(
+                tuple((rate.limit, rate.interval) for rate in rates),
+                bucket_class,
+                bucket_kwargs or {},
+                time_function or monotonic,
+            )
+        elif not limiter:
+            limiter = Limiter(
+                *rates,
+                bucket_class=bucket_class,
+                bucket_kwargs=bucket_kwargs,
+                time_function=time_function,
+            )
+        self.limiter = limiter
+        self.limit_statuses = frozenset(limit_statuses)
         self.max_delay = max_delay
         self.per_host = per_host
         self.bucket_name = bucket_name
-        self._default_bucket = str(uuid4())
+        self._default_bucket = default_bucket or _get_default_bucket(self.limiter)
 
         # If the superclass is an adapter or custom Session, pass along any valid keyword arguments
         session_kwargs = _get_valid_kwargs(super().__init__, kwargs)
@@ -87,26 +129,23 @@ class LimiterMixin(MIXIN_BASE):
         Raises:
             :py:exc:`.BucketFullException` if this request would result in a delay longer than ``max_delay``
         """
-        with self.limiter.ratelimit(
-            self._bucket_name(request),
-            delay=True,
-            max_delay=self.max_delay,
-        ):
+        bucket_name = self._bucket_name(request)
+        with self.limiter.ratelimit(bucket_name, delay=True, max_delay=self.max_delay):
             response = super().send(request, **kwargs)
             if response.status_code in self.limit_statuses:
-                self._fill_bucket(request)
+                self._fill_bucket(request, bucket_name)
             return response
 
-    def _bucket_name(self, request):
+    def _bucket_name(self, request: PreparedRequest) -> str:
         """Get a bucket name for the given request"""
         if self.bucket_name:
             return self.bucket_name
         elif self.per_host:
-            return urlparse(request.url).netloc
+            return _netloc_for(request.url)
         else:
             return self._default_bucket
 
-    def _fill_bucket(self, request: PreparedRequest):
+    def _fill_bucket(self, request: PreparedRequest, bucket_name: str):
         """Partially fill the bucket for the given request, requiring an extra delay until the next
         request. This is essentially an attempt to catch up to the actual (server-side) limit if
         we've gotten out of sync.
@@ -121,21 +160,18 @@ class LimiterMixin(MIXIN_BASE):
         If the server also has an hourly limit, we don't have enough information to know if we've
         exceeded that limit or how long to delay, so we'll keep delaying in 1-minute intervals.
         """
-        logger.info(f"Rate limit exceeded for {request.url}; filling limiter bucket")
-        bucket = self.limiter.bucket_group[self._bucket_name(request)]
+        if logger.isEnabledFor(INFO):
+            logger.info("Rate limit exceeded for %s; filling limiter bucket", request.url)
+        limiter = self.limiter
+        bucket = limiter.bucket_group[bucket_name]
 
         # Determine how many requests we've made within the smallest defined time interval
-        now = self.limiter.time_function()
-        rate = self.limiter._rates[0]
+        now = limiter.time_function()
+        rate = limiter._rates[0]
         item_count, _ = bucket.inspect_expired_items(now - rate.interval)
 
-        # TODO: After fixing usage with MemoryQueueBucket on py 3.11, don't add items over capacity
-        # capacity = bucket.maxsize() - bucket.size()
-        # n_filler_requests = min(capacity, rate.limit - item_count)
-
         # Add "filler" requests to reach the limit for that interval
-        for _ in range(rate.limit - item_count):
-            bucket.put(now)
+        _put_many(bucket, now, rate.limit - item_count)
 
 
 class LimiterSession(LimiterMixin, Session):
@@ -158,7 +194,8 @@ class LimiterSession(LimiterMixin, Session):
         per_month: Max requests per month
         burst: Max number of consecutive requests allowed before applying per-second rate-limiting
         bucket_class: Bucket backend class; may be one of
-            :py:class:`~pyrate_limiter.bucket.MemoryQueueBucket` (default),
+            :py:class:`.FastMemoryBucket` (default),
+            :py:class:`~pyrate_limiter.bucket.MemoryQueueBucket`,
             :py:class:`~pyrate_limiter.sqlite_bucket.SQLiteBucket`, or
             :py:class:`~pyrate_limiter.bucket.RedisBucket`
         bucket_kwargs: Bucket backend keyword arguments
@@ -167,6 +204,10 @@ class LimiterSession(LimiterMixin, Session):
             request and raise a :py:exc:`.BucketFullException`
         per_host: Track request rate limits separately for each host
         limit_statuses: Alternative HTTP status codes that indicate a rate limit was exceeded
+        share_limiter: Reuse the same Limiter (and buckets) for all sessions and adapters created
+            with the same rate limit and bucket settings. ``bucket_kwargs`` values must be hashable.
+            Shared Limiters are kept for the lifetime of the process, along with any bucket
+            connections they hold (e.g., SQLite connections or Redis pools).
     """
 
 
@@ -185,7 +226,116 @@ def _convert_rate(limit: float, interval: float) -> RequestRate:
     return RequestRate(fraction.numerator, interval * fraction.denominator)
 
 
+def _get_shared_limiter(
+    rates: Tuple[Tuple[int, int], ...],
+    bucket_class: Type[AbstractBucket],
+    bucket_kwargs: Dict,
+    time_function: Callable[[], float],
+) -> Tuple[Limiter, str]:
+    """Get a Limiter that can be shared between sessions with the same settings, along with a
+    shared default bucket name to use when not tracking rate limits per host
+    """
+    try:
+        key = (rates, bucket_class, frozenset(bucket_kwargs.items()), time_function)
+    except TypeError as e:
+        raise TypeError(f'share_limiter requires hashable bucket_kwargs values: {e}') from e
+
+    with _shared_limiters_lock:
+        if key not in _shared_limiters:
+            limiter = Limiter(
+                *[RequestRate(limit, interval) for limit, interval in rates],
+                bucket_class=bucket_class,
+                bucket_kwargs=bucket_kwargs,
+                time_function=time_function,
+            )
+            _shared_limiters[key] = (limiter, _get_default_bucket(limiter))
+        return _shared_limiters[key]
+
+
+def _put_many(bucket: AbstractBucket, item: float, n_items: int):
+    """Add ``n_items`` copies of an item to a bucket, up to the bucket's capacity. For known
+    backends, this is done in a single batch operation instead of one ``put()`` per item.
+    """
+    if isinstance(bucket, MemoryQueueBucket):
+        _put_many_queue(bucket, item, n_items)
+        return
+
+    n_items = min(n_items, bucket.maxsize() - bucket.size())
+    if n_items <= 0:
+        return
+    if isinstance(bucket, MemoryListBucket):
+        with bucket._lock:
+            bucket._q.extend([item] * n_items)
+    elif isinstance(bucket, SQLiteBucket):
+        bucket.connection.executemany(
+            f'INSERT INTO {bucket.table} (value) VALUES (?)', [(item,)] * n_items
+        )
+        bucket.connection.commit()
+        bucket._update_size(n_items)
+    elif isinstance(bucket, RedisBucket):
+        pipeline = bucket.get_pipeline()
+        pipeline.rpush(bucket._bucket_name, *([item] * n_items))
+        if bucket._expire_time is not None:
+            pipeline.expire(bucket._bucket_name, bucket._expire_time)
+        pipeline.execute()
+    else:
+        put = bucket.put
+        for _ in range(n_items):
+            put(item)
+
+
+def _put_many_queue(bucket: MemoryQueueBucket, item: float, n_items: int):
+    """Add items to a MemoryQueueBucket. Queue.put() blocks when full, so this adds items to the
+    underlying deque directly instead.
+    """
+    queue = bucket._q
+    with queue.mutex:
+        if queue.maxsize > 0:
+            n_items = min(n_items, queue.maxsize - len(queue.queue))
+        if n_items > 0:
+            queue.queue.extend([item] * n_items)
+            queue.unfinished_tasks += n_items
+            queue.not_empty.notify(n_items)
+
+
 def _get_valid_kwargs(func: Callable, kwargs: Dict) -> Dict:
     """Get the subset of non-None ``kwargs`` that are valid params for ``func``"""
-    sig_params = list(signature(func).parameters)
+    # Look up params on the underlying function, so bound methods from different instances share
+    # a cache entry (and the cache doesn't hold references to those instances)
+    sig_params = _get_param_names(getattr(func, '__func__', func))
     return {k: v for k, v in kwargs.items() if k in sig_params and v is not None}
+
+
+@lru_cache(maxsize=64)
+def _get_param_names(func: Callable) -> FrozenSet[str]:
+    """Get the names of all params for ``func``. For plain functions, these can be read directly
+    from the code object, which is much faster than building a full signature.
+    """
+    code = getattr(func, '__code__', None)
+    if code is None or hasattr(func, '__wrapped__'):
+        return frozenset(signature(func).parameters)
+    return frozenset(code.co_varnames[: code.co_argcount + code.co_kwonlyargcount])
+
+
+@lru_cache(maxsize=256)
+def _netloc_for(url: str) -> str:
+    """Get the host portion of a URL, cached since the same URLs tend to be requested repeatedly.
+    Typical ``scheme://host/path`` URLs are split directly, with ``urlparse()`` as a fallback.
+    """
+    _, sep, rest = url.partition('://')
+    if not sep:
+        return urlparse(url).netloc
+    for delimiter in '/?#':
+        rest = rest.partition(delimiter)[0]
+    return rest
+
+
+def _get_default_bucket(limiter: Limiter) -> str:
+    """Get a unique bucket name to use when not tracking rate limits per host.
+
+    In-memory buckets only need to be unique within the current process. Persistent buckets may be
+    shared across processes, so they still need a globally unique name.
+    """
+    if issubclass(limiter._bkclass, MEMORY_BUCKETS):
+        return f'_default_{next(_default_bucket_ids)}'
+    return str(uuid4())